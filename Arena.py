@@ -1,14 +1,19 @@
 from tqdm import tqdm
 import numpy as np
+import time
 
 class Arena():
-    def __init__(self, player1, player2, game):
+    def __init__(self, player1, player2, game, history=None):
         """
         Initializes the Arena with two players and a game instance.
+        :param history: Optional `history.MatchHistory` where the games of `playGames` are recorded.
         """
         self.player1 = player1
         self.player2 = player2
         self.game = game
+        self.history = history
+        self.latencies = {1: [], -1: []}  # Seconds per move of the last game, keyed by player
+        self.length = 0  # Number of moves of the last game
 
     def playGame(self, verbose=False):
         """
@@ -18,6 +23,7 @@ class Arena():
         players = [self.player2, None, self.player1]
         curPlayer = 1  # Player 1 starts
         self.game.getInitBoard()  # Initialize game board
+        self.latencies = {1: [], -1: []}
         it = 0
 
         while True:
@@ -27,7 +33,9 @@ class Arena():
                 self.game.display()
 
             player = players[curPlayer + 1]
+            start = time.perf_counter()
             action = player.play()
+            self.latencies[curPlayer].append(time.perf_counter() - start)
 
             valids = self.game.getValidMoves()  # Ensure action is valid
             if valids[action] == 0:
@@ -36,6 +44,7 @@ class Arena():
             next_board, next_player = self.game.getNextState(action)
             r = self.game.getGameResult()  # Check if game ended
             if r != 0:
+                self.length = it
                 if verbose:
                     print("Game over: Turn", str(it), "Result", str(r))
                     self.game.display()
@@ -50,28 +59,50 @@ class Arena():
         """
         num = int(num / 2)  # Half games start with player1, half with player2
         oneWon, twoWon, draws = 0, 0, 0
+        match_id, player_ids = None, None
+        if self.history is not None:
+            match_id = self.history.start_match(self.player1, self.player2)
+            player_ids = self.history.match_players(match_id)
 
-        # First set of games with player1 starting
-        for _ in tqdm(range(num), desc="Arena.playGames (1)"):
-            gameResult = self.playGame(verbose=verbose)
-            if gameResult == 1:
-                oneWon += 1
-            elif gameResult == -1:
-                twoWon += 1
-            else:
-                draws += 1
+        try:
+            # First set of games with player1 starting
+            for _ in tqdm(range(num), desc="Arena.playGames (1)"):
+                gameResult = self.playGame(verbose=verbose)
+                self._record(match_id, player_ids, gameResult)
+                if gameResult == 1:
+                    oneWon += 1
+                elif gameResult == -1:
+                    twoWon += 1
+                else:
+                    draws += 1
 
-        # Switch players for second set of games
-        self.player1, self.player2 = self.player2, self.player1
+            # Switch players for second set of games
+            self.player1, self.player2 = self.player2, self.player1
+            player_ids = player_ids[::-1] if player_ids is not None else None
 
-        # Second set of games with player2 starting
-        for _ in tqdm(range(num), desc="Arena.playGames (2)"):
-            gameResult = self.playGame(verbose=verbose)
-            if gameResult == -1:
-                oneWon += 1
-            elif gameResult == 1:
-                twoWon += 1
-            else:
-                draws += 1
+            # Second set of games with player2 starting
+            for _ in tqdm(range(num), desc="Arena.playGames (2)"):
+                gameResult = self.playGame(verbose=verbose)
+                self._record(match_id, player_ids, gameResult)
+                if gameResult == -1:
+                    oneWon += 1
+                elif gameResult == 1:
+                    twoWon += 1
+                else:
+                    draws += 1
+        finally:
+            # Games recorded so far are kept even if the run is interrupted
+            if self.history is not None:
+                self.history.end_match(match_id)
 
         return oneWon, twoWon, draws
+
+    def _record(self, match_id, player_ids, gameResult):
+        """
+        Buffers the last game in the history store.
+        :param player_ids: History ids of (player1, player2); player1 always moves first.
+        """
+        if self.history is None:
+            return
+        self.history.record_game(match_id, player_ids[0], player_ids[1], gameResult, self.length,
+                                 self.latencies[1], self.latencies[-1])
@@ -4,7 +4,9 @@ from tensorflow.keras import layers
 from collections import deque
 import random
 import os
+import time
 from utils import dotdict
+from checkpoint import CheckpointManager
 
 class Player:
     def play(self):
@@ -14,14 +16,46 @@ class Player:
         """
         pass
 
+    @staticmethod
+    def _check_masks(masks):
+        masks = np.asarray(masks) == 1
+        if masks.ndim != 2:
+            raise ValueError(f"Expected masks of shape (N, action_size), got {masks.shape}")
+        if not masks.any(axis=1).all():
+            raise ValueError("No valid actions available!")
+        return masks
+
+    @staticmethod
+    def _masked_random(rng, masks):
+        """
+        Uniformly picks one valid action per row: the largest random key among valid moves wins.
+        """
+        return np.where(masks, rng.random(masks.shape), -1.0).argmax(axis=1)
+
+    @staticmethod
+    def _masked_argmax(values, masks):
+        """
+        Picks the valid action with the highest value in each row.
+        """
+        return np.where(masks, values, -np.inf).argmax(axis=1)
+
 class RandomPlayer(Player):
-    def __init__(self, game):
+    def __init__(self, game, seed=None):
         self.game = game
+        self.rng = np.random.default_rng(seed)
 
     def play(self):
         valid_moves = self.game.getValidMoves()
-        valid_actions = np.where(valid_moves == 1)[0]
-        return np.random.choice(valid_actions)
+        return self.play_batch(None, valid_moves[np.newaxis])[0]
+
+    def play_batch(self, boards, masks):
+        """
+        Picks a random valid action for each of N games. The boards are ignored.
+        :param boards: Array of N canonical boards, shape (N, board_x, board_y).
+        :param masks: Array of N valid-move masks, shape (N, action_size), 1 for valid moves.
+        :return: Array of N actions.
+        """
+        return self._masked_random(self.rng, self._check_masks(masks))
 
 class HumanPlayer(Player):
     def __init__(self, game):
@@ -52,13 +86,17 @@ How to set up a DQN Player:
    - Use the `DQNPlayer` class to interact with the environment. The player class maintains the main model (`model`) and a target model (`target_model`) to stabilize training.
    - It uses a replay buffer (`memory`) to store experiences and learn from them by sampling random batches during training.
    - The `play` method is a crucial part of each player and must be implemented. It decides actions using an epsilon-greedy strategy to balance exploration and exploitation.
+   - The optional `play_batch(boards, masks)` method picks actions for N games at once with array operations, so a multi-game driver needs a single call (and a single `predict`) per step.
 
 4. **Training and Target Update**:
    - The training process involves sampling experiences from the replay buffer, calculating target Q-values using the target network, and fitting the main model to minimize the loss between current Q-values and target Q-values.
    - The target model is updated periodically to match the weights of the main model, which helps stabilize learning.
+     `target_update_interval` controls how often the sync happens and `tau` < 1 turns it into a soft (Polyak) update.
 
 5. **Save and Load Model**:
    - The `save` and `load` methods are used to save the model weights to a file and load them back when needed.
+   - The `checkpoint` method snapshots the weights in memory and writes them to `checkpoint_dir` from a background thread,
+     keeping only the `checkpoint_keep` most recent files. Time spent is accumulated in `timings`.
 """
 
 
@@ -68,6 +106,11 @@ DQNPlayer_args = dotdict({
     'epsilon_start': 1.0,
     'epsilon_min': 0.01,
     'epsilon_decay': 0.5,
+    'target_update_interval': 1,  # Sync the target model every N calls to update_target_model
+    'tau': 1.0,  # 1.0 copies the weights, < 1.0 applies a soft (Polyak) update
+    'checkpoint_dir': os.path.join(os.path.dirname(os.path.abspath(__file__)), 'checkpoints'),
+    'checkpoint_keep': 3,
+    'seed': None,  # Seed of the random generator used for exploration
     # 'model_path': './my.weights.h5'
 })
 
@@ -102,12 +145,39 @@ class DQNPlayer(Player):
         self.epsilon_decay = args.epsilon_decay
         self.previous_state = None
         self.previous_action = None
+        self.rng = np.random.default_rng(args.get('seed'))
+        self.target_update_interval = args.get('target_update_interval', 1)
+        self.tau = args.get('tau', 1.0)
+        self.target_update_count = 0
+        self._copy_target = None
+        self._sync_target = None
+        self.checkpoints = None
+        self._timings = {'checkpoint': 0.0, 'target_sync': 0.0}  # Seconds spent blocking the training loop
+
+    @property
+    def timings(self):
+        """
+        Seconds spent checkpointing and syncing the target model,
+        plus the time the background thread spent writing checkpoints.
+        """
+        write_time = self.checkpoints.write_time if self.checkpoints is not None else 0.0
+        return dict(self._timings, checkpoint_write=write_time)
 
     def _build_model(self):
         model = DQNModel(self.action_size)
         model.compile(optimizer=tf.keras.optimizers.Adam(learning_rate=self.args.lr), loss='mse')
         return model
 
+    def _input_shape(self):
+        return (1, self.game.board_x, self.game.board_y, 1)
+
+    def _ensure_built(self, model):
+        """
+        Subclassed models only create their variables on the first call.
+        """
+        if not model.built:
+            model(np.zeros(self._input_shape(), dtype=np.float32))
+
     def play(self):
         """
         Predict the next action using epsilon-greedy strategy.
@@ -120,24 +190,30 @@ class DQNPlayer(Player):
             self.remember(self.previous_state, self.previous_action, reward, current_state, done)
 
         valid_moves = self.game.getValidMoves()
-        valid_actions = np.where(valid_moves == 1)[0]
-
-        if len(valid_actions) == 0:
-            raise ValueError("No valid actions available!")
-
-        if np.random.rand() <= self.epsilon:
-            action = np.random.choice(valid_actions)  # Random action (exploration)
-        else:
-            state_input = np.array(current_state).reshape(-1, self.game.board_x, self.game.board_y, 1)
-            q_values = self.model.predict(state_input, verbose=0)[0]
-            q_values[valid_moves == 0] = -float('inf')  # Mask invalid actions
-            action = np.argmax(q_values)
+        action = self.play_batch(np.asarray(current_state)[np.newaxis], valid_moves[np.newaxis])[0]
 
         self.previous_state = current_state
         self.previous_action = action
 
         return action
 
+    def play_batch(self, boards, masks):
+        """
+        Predict one action for each of N games using the epsilon-greedy strategy.
+        The model is only run on the boards that exploit, in a single batched predict call.
+        """
+        masks = self._check_masks(masks)
+        boards = np.asarray(boards)
+        if len(boards) != len(masks):
+            raise ValueError(f"Got {len(boards)} boards but {len(masks)} masks")
+        actions = self._masked_random(self.rng, masks)  # Random actions (exploration)
+        exploit = self.rng.random(len(masks)) > self.epsilon
+        if exploit.any():
+            state_input = boards[exploit].reshape(-1, self.game.board_x, self.game.board_y, 1)
+            q_values = self.model.predict(state_input, verbose=0)
+            actions[exploit] = self._masked_argmax(q_values, masks[exploit])
+        return actions
+
     def getReward(self):
         """
         Calculates the reward based on the game state.
@@ -192,9 +268,62 @@ class DQNPlayer(Player):
 
     def update_target_model(self):
         """
-        Update the target model weights with the trained model's weights.
+        Update the target model weights with the trained model's weights every `target_update_interval` calls.
+        With `tau` == 1 the weights are copied, otherwise target = tau * model + (1 - tau) * target.
+        The first call always copies the weights, so the target never starts from its own random initialization.
+        The variables are assigned inside a tf.function, without a round trip through NumPy.
         """
-        self.target_model.set_weights(self.model.get_weights())
+        start = time.perf_counter()
+        self.target_update_count += 1
+        if self._sync_target is None:
+            self._ensure_built(self.model)
+            self._ensure_built(self.target_model)
+            self._copy_target = self._make_sync_target(1.0)
+            self._sync_target = self._copy_target if self.tau == 1.0 else self._make_sync_target(self.tau)
+            self._copy_target()
+        elif self.target_update_count % self.target_update_interval == 0:
+            self._sync_target()
+        self._timings['target_sync'] += time.perf_counter() - start
+
+    def _make_sync_target(self, tau):
+        pairs = list(zip(self.target_model.weights, self.model.weights))
+
+        @tf.function
+        def sync():
+            for target_var, var in pairs:
+                if tau == 1.0:
+                    target_var.assign(var)
+                else:
+                    target_var.assign(tau * var + (1.0 - tau) * target_var)
+
+        return sync
+
+    def checkpoint(self, step):
+        """
+        Snapshot the model weights and write them to `checkpoint_dir` in the background.
+        Returns: The path the checkpoint will be written to.
+        """
+        start = time.perf_counter()
+        if self.checkpoints is None:
+            self.checkpoints = CheckpointManager(
+                self._build_model,
+                self._input_shape(),
+                self.args.get('checkpoint_dir', 'checkpoints'),
+                keep=self.args.get('checkpoint_keep', 3),
+            )
+        self._ensure_built(self.model)
+        path = self.checkpoints.save(self.model, step)
+        self._timings['checkpoint'] += time.perf_counter() - start
+        return path
+
+    def close_checkpoints(self):
+        """
+        Wait for pending checkpoints to be written and stop the writer thread.
+        Does nothing if no checkpoint was taken.
+        """
+        if self.checkpoints is None:
+            return
+        self.checkpoints.close()
 
     def load(self, filepath):
         filepath = f"{filepath}.weights.h5" if not filepath.endswith(".weights.h5") else filepath
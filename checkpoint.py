@@ -0,0 +1,156 @@
+import os
+import glob
+import queue
+import threading
+import time
+import numpy as np
+
+
+class CheckpointManager():
+    def __init__(self, build_model, input_shape, directory, prefix="ckpt", keep=3):
+        """
+        Initializes the CheckpointManager.
+        :param build_model: A callable returning a fresh (compiled) model with the same architecture
+                            as the one being checkpointed. It is used to create a shadow model that is
+                            only touched by the background writer thread.
+        :param input_shape: Shape of one batched input (e.g. (1, board_x, board_y, 1)), used to build the shadow model.
+        :param directory: Directory where `.weights.h5` files are written.
+        :param prefix: File name prefix for checkpoints (`<prefix>-<step>.weights.h5`).
+        :param keep: Number of most recent checkpoints to retain; older ones are deleted. None keeps all.
+        """
+        self.build_model = build_model
+        self.input_shape = input_shape
+        self.directory = directory
+        self.prefix = prefix
+        self.keep = keep
+
+        self.error = None  # Last exception raised by the writer thread, if any
+
+        os.makedirs(self.directory, exist_ok=True)
+
+        self._write_time = 0.0
+        self._closed = False
+        self._shadow_model = None
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._worker, daemon=True)
+        self._thread.start()
+
+    @property
+    def write_time(self):
+        """
+        Seconds spent so far by the background thread writing files.
+        """
+        with self._lock:
+            return self._write_time
+
+    def path_for(self, step):
+        """
+        Returns the checkpoint file path for the given step.
+        """
+        return os.path.join(self.directory, f"{self.prefix}-{step}.weights.h5")
+
+    def save(self, model, step):
+        """
+        Snapshots the model weights in memory and queues them to be written in the background.
+        Only the copy of the weights happens on the calling thread.
+        Returns: The path the checkpoint will be written to.
+        """
+        self._check_open()
+        weights = model.get_weights()  # Already fresh NumPy copies
+        self._queue.put((step, weights))
+        return self.path_for(step)
+
+    def wait(self):
+        """
+        Blocks until every queued checkpoint has been written.
+        Raises the last writer error, if any.
+        """
+        self._check_open()
+        self._queue.join()
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise error
+
+    def close(self):
+        """
+        Flushes pending checkpoints and stops the background thread.
+        Calling it again does nothing.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join()
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise error
+
+    def checkpoints(self):
+        """
+        Returns the existing checkpoint paths, oldest first.
+        """
+        pattern = os.path.join(self.directory, f"{self.prefix}-*.weights.h5")
+        return sorted(glob.glob(pattern), key=self._step_of)
+
+    def latest(self):
+        """
+        Returns the path of the most recent checkpoint, or None if there is none.
+        """
+        paths = self.checkpoints()
+        return paths[-1] if paths else None
+
+    def _check_open(self):
+        if self._closed:
+            raise RuntimeError("CheckpointManager is closed")
+
+    def _step_of(self, path):
+        name = os.path.basename(path)[len(self.prefix) + 1:-len(".weights.h5")]
+        return int(name) if name.isdigit() else -1
+
+    def _worker(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                step, weights = item
+                start = time.perf_counter()
+                self._write(step, weights)
+                self._prune()
+                with self._lock:
+                    self._write_time += time.perf_counter() - start
+            except Exception as e:
+                self.error = e
+            finally:
+                self._queue.task_done()
+
+    def _write(self, step, weights):
+        """
+        Writes the weights to a temporary file and atomically renames it into place,
+        so readers never see a partially written checkpoint.
+        """
+        if self._shadow_model is None:
+            self._shadow_model = self.build_model()
+            self._shadow_model(np.zeros(self.input_shape, dtype=np.float32))  # Create the variables
+        self._shadow_model.set_weights(weights)
+
+        path = self.path_for(step)
+        tmp_path = os.path.join(self.directory, f".tmp-{self.prefix}-{step}.weights.h5")  # Keras requires the suffix
+        try:
+            self._shadow_model.save_weights(tmp_path)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def _prune(self):
+        """
+        Deletes the oldest checkpoints beyond the retention limit.
+        """
+        if self.keep is None:
+            return
+        paths = self.checkpoints()
+        for path in paths[:max(len(paths) - self.keep, 0)]:
+            os.remove(path)
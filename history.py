@@ -0,0 +1,292 @@
+import argparse
+import glob
+import hashlib
+import os
+import sqlite3
+import sys
+import time
+from collections import Counter
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS players (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    version TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    UNIQUE (name, version)
+);
+CREATE TABLE IF NOT EXISTS matches (
+    id INTEGER PRIMARY KEY,
+    player1_id INTEGER NOT NULL REFERENCES players(id),
+    player2_id INTEGER NOT NULL REFERENCES players(id),
+    started_at REAL NOT NULL,
+    finished_at REAL
+);
+CREATE TABLE IF NOT EXISTS games (
+    id INTEGER PRIMARY KEY,
+    match_id INTEGER REFERENCES matches(id),
+    first_id INTEGER NOT NULL REFERENCES players(id),
+    second_id INTEGER NOT NULL REFERENCES players(id),
+    result INTEGER NOT NULL,  -- 1 first player won, -1 second player won, 0 draw
+    length INTEGER NOT NULL,
+    first_latency_mean REAL,
+    first_latency_max REAL,
+    second_latency_mean REAL,
+    second_latency_max REAL,
+    played_at REAL NOT NULL
+);
+-- Running totals per ordered (player, opponent) pair, kept in sync on every insert
+-- so leaderboard and head-to-head queries never scan the games table.
+CREATE TABLE IF NOT EXISTS standings (
+    player_id INTEGER NOT NULL REFERENCES players(id),
+    opponent_id INTEGER NOT NULL REFERENCES players(id),
+    wins INTEGER NOT NULL DEFAULT 0,
+    losses INTEGER NOT NULL DEFAULT 0,
+    draws INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (player_id, opponent_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS games_first ON games (first_id, second_id, played_at);
+CREATE INDEX IF NOT EXISTS games_second ON games (second_id, first_id, played_at);
+CREATE INDEX IF NOT EXISTS games_match ON games (match_id);
+CREATE INDEX IF NOT EXISTS players_name ON players (name);
+"""
+
+
+def player_version(player):
+    """
+    Returns a short hash identifying the version of a player: its module source,
+    any `.weights.h5` files shipped next to it and, if it has a `model`, the
+    weights it is currently playing with.
+    """
+    digest = hashlib.sha1()
+    module = sys.modules.get(type(player).__module__)
+    path = getattr(module, "__file__", None)
+    if path is None or not os.path.isfile(path):
+        digest.update(type(player).__qualname__.encode())
+    else:
+        for filepath in [path] + sorted(glob.glob(os.path.join(os.path.dirname(path), "*.weights.h5"))):
+            with open(filepath, "rb") as f:
+                digest.update(f.read())
+    model = getattr(player, "model", None)
+    if model is not None:
+        for w in model.get_weights():
+            digest.update(w.tobytes())
+    return digest.hexdigest()[:12]
+
+
+def player_name(player):
+    """
+    Returns the default name of a player, e.g. `CXXXXXXXXX.players.DQNPlayer`.
+    """
+    return f"{type(player).__module__}.{type(player).__qualname__}"
+
+
+def _summary(latencies):
+    if not latencies:
+        return None, None
+    return sum(latencies) / len(latencies), max(latencies)
+
+
+class MatchHistory():
+    def __init__(self, path="history.db", batch_size=1000):
+        """
+        Opens (or creates) the SQLite match-history store.
+        :param path: Path to the database file.
+        :param batch_size: Number of buffered games that triggers a bulk insert.
+        """
+        self.path = path
+        self.batch_size = batch_size
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self._match_players = {}  # match id -> (player1 id, player2 id) while the match is running
+        self._buffer = []
+
+    def register(self, player, name=None, version=None):
+        """
+        Returns the id of a player, inserting it on first use.
+        The name and version default to `player_name` and `player_version`; the version
+        is recomputed on every call, so a player trained in place gets a new id.
+        """
+        name = name or player_name(player)
+        version = version or player_version(player)
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR IGNORE INTO players (name, version, created_at) VALUES (?, ?, ?)",
+                (name, version, time.time()),
+            )
+        return self.conn.execute(
+            "SELECT id FROM players WHERE name = ? AND version = ?", (name, version)
+        ).fetchone()[0]
+
+    def start_match(self, player1, player2):
+        """
+        Records the start of a match between two players, resolving their versions once.
+        Returns: The match id; `match_players` gives the resolved player ids.
+        """
+        player1_id, player2_id = self.register(player1), self.register(player2)
+        with self.conn:
+            cursor = self.conn.execute(
+                "INSERT INTO matches (player1_id, player2_id, started_at) VALUES (?, ?, ?)",
+                (player1_id, player2_id, time.time()),
+            )
+        self._match_players[cursor.lastrowid] = (player1_id, player2_id)
+        return cursor.lastrowid
+
+    def match_players(self, match_id):
+        """
+        Returns the (player1 id, player2 id) resolved when a running match was started.
+        """
+        return self._match_players[match_id]
+
+    def end_match(self, match_id):
+        """
+        Flushes buffered games and records the end of a match.
+        """
+        self.flush()
+        self._match_players.pop(match_id, None)
+        with self.conn:
+            self.conn.execute("UPDATE matches SET finished_at = ? WHERE id = ?", (time.time(), match_id))
+
+    def record_game(self, match_id, first_id, second_id, result, length, first_latencies=(), second_latencies=()):
+        """
+        Buffers the outcome of one game; games are written in batches.
+        :param first_id: Id of the player who moved first, as returned by `match_players`.
+        :param second_id: Id of the player who moved second.
+        :param result: 1 if the first player won, -1 if the second player won, anything else is a draw.
+        :param length: Number of moves played.
+        :param first_latencies: Seconds taken by each move of the first player.
+        :param second_latencies: Seconds taken by each move of the second player.
+        """
+        result = result if result in (1, -1) else 0
+        self._buffer.append((
+            match_id, first_id, second_id, result, length,
+            *_summary(first_latencies), *_summary(second_latencies), time.time(),
+        ))
+        if len(self._buffer) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """
+        Writes buffered games and their standings updates in a single transaction.
+        """
+        if not self._buffer:
+            return
+        totals = Counter()
+        for row in self._buffer:
+            first_id, second_id, result = row[1], row[2], row[3]
+            totals[(first_id, second_id, result)] += 1
+            totals[(second_id, first_id, -result)] += 1
+        with self.conn:
+            self.conn.executemany(
+                "INSERT INTO games (match_id, first_id, second_id, result, length, "
+                "first_latency_mean, first_latency_max, second_latency_mean, second_latency_max, played_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                self._buffer,
+            )
+            self.conn.executemany(
+                "INSERT INTO standings (player_id, opponent_id, wins, losses, draws) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (player_id, opponent_id) DO UPDATE SET "
+                "wins = wins + excluded.wins, losses = losses + excluded.losses, draws = draws + excluded.draws",
+                [
+                    (player_id, opponent_id, count * (result == 1), count * (result == -1), count * (result == 0))
+                    for (player_id, opponent_id, result), count in totals.items()
+                ],
+            )
+        self._buffer = []
+
+    def close(self):
+        self.flush()
+        self.conn.close()
+
+    def leaderboard(self, limit=20):
+        """
+        Returns rows (name, version, games, wins, losses, draws, score) sorted by score,
+        where score = (wins + 0.5 * draws) / games.
+        """
+        return self.conn.execute(
+            "SELECT p.name, p.version, SUM(s.wins + s.losses + s.draws) AS games, "
+            "SUM(s.wins), SUM(s.losses), SUM(s.draws), "
+            "(SUM(s.wins) + 0.5 * SUM(s.draws)) * 1.0 / SUM(s.wins + s.losses + s.draws) AS score "
+            "FROM standings s JOIN players p ON p.id = s.player_id "
+            "GROUP BY s.player_id ORDER BY score DESC, games DESC LIMIT ?",
+            (limit,),
+        ).fetchall()
+
+    def head_to_head(self, name, opponent):
+        """
+        Returns rows (version, opponent_version, wins, losses, draws) for every
+        version pair of two player names, from the point of view of `name`.
+        """
+        return self.conn.execute(
+            "SELECT p.version, o.version, s.wins, s.losses, s.draws "
+            "FROM players p JOIN standings s ON s.player_id = p.id JOIN players o ON o.id = s.opponent_id "
+            "WHERE p.name = ? AND o.name = ? ORDER BY p.created_at, o.created_at",
+            (name, opponent),
+        ).fetchall()
+
+    def opponents(self, name):
+        """
+        Returns rows (version, opponent, opponent_version, wins, losses, draws) against every opponent.
+        """
+        return self.conn.execute(
+            "SELECT p.version, o.name, o.version, s.wins, s.losses, s.draws "
+            "FROM players p JOIN standings s ON s.player_id = p.id JOIN players o ON o.id = s.opponent_id "
+            "WHERE p.name = ? ORDER BY p.created_at, o.name, o.created_at",
+            (name,),
+        ).fetchall()
+
+    def timeline(self, name):
+        """
+        Returns rows (day, games, wins, losses, draws) for a player name across all opponents.
+        """
+        return self.conn.execute(
+            "SELECT day, COUNT(*), SUM(score = 1), SUM(score = -1), SUM(score = 0) FROM ("
+            " SELECT date(g.played_at, 'unixepoch') AS day, g.result AS score"
+            " FROM players p JOIN games g ON g.first_id = p.id WHERE p.name = ?"
+            " UNION ALL"
+            " SELECT date(g.played_at, 'unixepoch') AS day, -g.result AS score"
+            " FROM players p JOIN games g ON g.second_id = p.id WHERE p.name = ?"
+            ") GROUP BY day ORDER BY day",
+            (name, name),
+        ).fetchall()
+
+
+def _print_rows(header, rows):
+    rows = [tuple("" if v is None else f"{v:.3f}" if isinstance(v, float) else str(v) for v in row) for row in rows]
+    widths = [max([len(h)] + [len(r[i]) for r in rows]) for i, h in enumerate(header)]
+    print("  ".join(h.ljust(w) for h, w in zip(header, widths)).rstrip())
+    for row in rows:
+        print("  ".join(v.ljust(w) for v, w in zip(row, widths)).rstrip())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Query the match-history store.")
+    parser.add_argument("--db", default="history.db", help="Path to the SQLite database.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    leaderboard = commands.add_parser("leaderboard", help="Rank player versions by score.")
+    leaderboard.add_argument("--limit", type=int, default=20)
+    h2h = commands.add_parser("h2h", help="Head-to-head results between two players.")
+    h2h.add_argument("name")
+    h2h.add_argument("opponent")
+    player = commands.add_parser("player", help="Results of one player against all others, and over time.")
+    player.add_argument("name")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.db):
+        parser.error(f"{args.db} does not exist")
+    history = MatchHistory(args.db)
+    if args.command == "leaderboard":
+        _print_rows(("name", "version", "games", "wins", "losses", "draws", "score"), history.leaderboard(args.limit))
+    elif args.command == "h2h":
+        _print_rows(("version", "opponent_version", "wins", "losses", "draws"), history.head_to_head(args.name, args.opponent))
+    elif args.command == "player":
+        _print_rows(("version", "opponent", "opponent_version", "wins", "losses", "draws"), history.opponents(args.name))
+        print()
+        _print_rows(("day", "games", "wins", "losses", "draws"), history.timeline(args.name))
+    history.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -21,12 +21,18 @@ def main():
     arena = Arena(player1, random_player, game)
 
     num_training_games = 20  # Number of games to play for training
+    checkpoint_interval = 10  # Save a checkpoint every N training games
     print(f"Training the DQNPlayer with {num_training_games} games...")
     from tqdm import tqdm
-    for _ in tqdm(range(num_training_games)):
+    for i in tqdm(range(num_training_games)):
         arena.playGame()  # Play games to accumulate experiences for training
         player1.train()  # Train the DQN model after each game
         player1.update_target_model()  # Update the target model periodically
+        if (i + 1) % checkpoint_interval == 0:
+            player1.checkpoint(i + 1)  # Written in the background, training continues
+    player1.close_checkpoints()
+    print(f"Checkpointing: {player1.timings['checkpoint']:.3f}s in loop, {player1.timings['checkpoint_write']:.3f}s in background")
+    print(f"Target sync: {player1.timings['target_sync']:.3f}s")
 
 
     # 初始化 FXXXXXXXXX 的 DQNPlayer，並使用其專屬的 args
@@ -35,24 +41,34 @@ def main():
 
     print(f"Training the DQNPlayer with {num_training_games} games...")
     from tqdm import tqdm
-    for _ in tqdm(range(num_training_games)):
+    for i in tqdm(range(num_training_games)):
         arena.playGame()  # Play games to accumulate experiences for training
         player2.train()  # Train the DQN model after each game
         player2.update_target_model()  # Update the target model periodically
+        if (i + 1) % checkpoint_interval == 0:
+            player2.checkpoint(i + 1)  # Written in the background, training continues
+    player2.close_checkpoints()
+    print(f"Checkpointing: {player2.timings['checkpoint']:.3f}s in loop, {player2.timings['checkpoint_write']:.3f}s in background")
+    print(f"Target sync: {player2.timings['target_sync']:.3f}s")
 
-    # 設定對戰
-    arena = Arena(player1, player2, game)
+    # 設定對戰，對戰紀錄寫入 history.db（可用 `python history.py leaderboard` 查詢）
+    from history import MatchHistory
+    history = MatchHistory("history.db")
+    try:
+        arena = Arena(player1, player2, game, history=history)
 
-    # 開始對戰
-    num_games = 100
-    print(f"Starting {num_games} games between C_DQNPlayer and F_DQNPlayer...")
-    results = arena.playGames(num_games, verbose=False)
+        # 開始對戰
+        num_games = 100
+        print(f"Starting {num_games} games between C_DQNPlayer and F_DQNPlayer...")
+        results = arena.playGames(num_games, verbose=False)
 
-    # 顯示結果
-    print(f"\nResults after {num_games} games:")
-    print(f"C_DQNPlayer wins: {results[0]}")
-    print(f"F_DQNPlayer wins: {results[1]}")
-    print(f"Draws: {results[2]}")
+        # 顯示結果
+        print(f"\nResults after {num_games} games:")
+        print(f"C_DQNPlayer wins: {results[0]}")
+        print(f"F_DQNPlayer wins: {results[1]}")
+        print(f"Draws: {results[2]}")
+    finally:
+        history.close()
 
 if __name__ == "__main__":
     main()